@@ -0,0 +1,166 @@
+import gc
+import json
+import os
+import sys
+import tracemalloc
+from collections import Counter
+
+import plotly
+
+'''
+This file contains the memory accounting helpers used by the diagnostics route in main.py. They report how much memory
+the loaded DataFrames, the serialized dash layout, the indexes derived from references and any caches registered on the
+dashboard use, along with process level figures (RSS, object counts and optional tracemalloc allocation sites) for the
+worker that served the request.
+'''
+
+
+def deep_sizeof(obj, seen=None):
+    """Approximate the deep size in bytes of obj by walking containers and instance dicts"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    # pandas objects know their own deep usage far better than a generic walk
+    if hasattr(obj, "memory_usage") and hasattr(obj, "dtypes"):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "dtype") and hasattr(obj, "base"):
+        # numpy arrays: count the buffer of views too, and the objects an object array points at
+        if obj.base is not None:
+            size += obj.nbytes
+        if obj.dtype.kind == "O":
+            size += sum(deep_sizeof(item, seen) for item in obj.ravel())
+    elif hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    return size
+
+
+def dataframe_memory(frame):
+    """Deep memory usage of a DataFrame, broken down per column"""
+    usage = frame.memory_usage(deep=True)
+    return {
+        "rows": int(len(frame)),
+        "total_bytes": int(usage.sum()),
+        "columns": {str(column): int(size) for column, size in usage.items()},
+    }
+
+
+def rss_bytes():
+    """Current resident set size of this process, falling back to peak RSS where /proc is unavailable"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    try:
+        import resource
+    except ImportError:  # windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes everywhere else
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def layout_memory(layout):
+    """Size of the layout once serialized for the browser, with each DataTable's tooltip_data split out"""
+    tooltips = {}
+    for component in layout._traverse():
+        tooltip_data = getattr(component, "tooltip_data", None)
+        if tooltip_data is not None:
+            tooltips[str(component.id)] = {
+                "rows": len(tooltip_data),
+                "serialized_bytes": len(json.dumps(tooltip_data, cls=plotly.utils.PlotlyJSONEncoder)),
+            }
+
+    return {
+        "serialized_bytes": len(json.dumps(layout, cls=plotly.utils.PlotlyJSONEncoder)),
+        "tooltip_data": tooltips,
+    }
+
+
+def cache_memory(caches):
+    """Deep size of each cache registered on the dashboard, plus hit/miss counts for functools caches"""
+    report = {}
+    for name, cache in caches.items():
+        if hasattr(cache, "cache_info"):
+            info = cache.cache_info()
+            report[name] = {"entries": info.currsize, "hits": info.hits, "misses": info.misses,
+                            "maxsize": info.maxsize}
+            # the entries of a functools cache cannot be walked, so size the object whose method it caches instead
+            owner = getattr(getattr(cache, "__wrapped__", None), "__self__", cache)
+        else:
+            report[name] = {"entries": len(cache) if hasattr(cache, "__len__") else None}
+            owner = cache
+        report[name]["deep_bytes"] = deep_sizeof(owner)
+    return report
+
+
+def object_counts(top_n=20):
+    """The most common live object types tracked by the garbage collector"""
+    counts = Counter(type(obj).__name__ for obj in gc.get_objects())
+    return {
+        "tracked_objects": sum(counts.values()),
+        "top_types": dict(counts.most_common(top_n)),
+    }
+
+
+def tracemalloc_report(action):
+    """Start or stop tracing ("start"/"stop"), or report the top N allocation sites when action is an int N. Tracing is
+    never started implicitly because it slows the worker down and inflates its RSS for as long as it runs"""
+    if action == "start":
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        return {"status": "started"}
+    if action == "stop":
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return {"status": "stopped"}
+    if not tracemalloc.is_tracing():
+        return {"status": "not tracing, request ?tracemalloc=start first", "sites": []}
+
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "status": "tracing",
+        "traced_current_bytes": current,
+        "traced_peak_bytes": peak,
+        "sites": [
+            {"location": str(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:action]
+        ],
+    }
+
+
+def memory_report(board, tracemalloc_action=None):
+    """Build the full memory report for a dashboard instance served by this worker"""
+    report = {
+        "pid": os.getpid(),
+        "ppid": os.getppid(),
+        "rss_bytes": rss_bytes(),
+        "dataframes": {
+            "df": dataframe_memory(board.df),
+            "references": dataframe_memory(board.references),
+        },
+        "layout": layout_memory(board.dash_app.layout),
+        "caches": cache_memory(board.caches),
+        "derived_indexes": {name: deep_sizeof(index) for name, index in board.reference_indexes().items()},
+        "objects": object_counts(),
+    }
+    if tracemalloc_action is not None:
+        report["tracemalloc"] = tracemalloc_report(tracemalloc_action)
+    # whether tracing is running once this request's start/stop has been applied; while it is, rss_bytes on later
+    # requests includes tracemalloc's own allocations
+    report["tracemalloc_tracing"] = tracemalloc.is_tracing()
+    return report
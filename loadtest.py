@@ -0,0 +1,428 @@
+import argparse
+import json
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import traceback
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+'''
+This file is a local load-testing tool for the OPSS flask/dash application. It builds a workload either from the usage
+log written by main.py (logs/OPSS_usage.log) or from a synthetic profile, then runs many concurrent simulated users
+against a running instance (or a gunicorn instance it spawns itself) and reports throughput and p50/p95/p99 latency
+per page and per dash callback.
+
+Dash callbacks are driven through the real /dash/_dash-update-component protocol. Each simulated user downloads the
+layout and callback graph, keeps its own copy of the component props and fires callbacks in dependency order the same way
+the dash renderer does in the browser, so adding or changing single-output callbacks between components with string ids
+in visualisations.py needs no changes here. Multi-output and pattern-matching (dict id) callbacks are not emulated; they
+are skipped with a warning and their latency is not measured.
+
+Example:
+    python loadtest.py --spawn --workers 4 --clients 20 --duration 60 --token <token>
+'''
+
+# Usage log lines look like: "2024-09-27 12:06:31,362 User with IP: 127.0.0.1 accessed http://127.0.0.1:5001/ at ..."
+USAGE_LINE = re.compile(r"^(\S+ \S+),\d+ User with IP: (\S+) accessed (\S+) at ")
+SESSION_GAP = timedelta(minutes=30)
+
+# Interactions performed after each page load, weighted by how often users do them
+SYNTHETIC_PROFILE = {
+    "pages": {"/": 0.7, "/standards": 0.1, "/about": 0.1, "/topics": 0.1},
+    "pages_per_session": (1, 3),
+    "actions_per_page": (2, 8),
+    "actions": {"search": 0.3, "select_table": 0.3, "select_table_two": 0.2, "layer_toggle": 0.1,
+                "sunburst_click": 0.1},
+}
+
+
+# WORKLOAD
+def load_usage_sessions(path):
+    """Group usage log hits into per-IP sessions, splitting whenever a user is idle for longer than SESSION_GAP"""
+    hits = defaultdict(list)
+    with open(path, encoding="utf-8") as log:
+        for line in log:
+            match = USAGE_LINE.match(line)
+            if not match:
+                continue
+            timestamp, ip, url = match.groups()
+            page = urllib.parse.urlparse(url).path or "/"
+            if page == "/favicon.ico" or page.startswith("/diagnostics/"):
+                continue
+            hits[ip].append((datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S"), page))
+
+    sessions = []
+    for ip_hits in hits.values():
+        ip_hits.sort()
+        current = []
+        for i, (timestamp, page) in enumerate(ip_hits):
+            if current and timestamp - ip_hits[i - 1][0] > SESSION_GAP:
+                sessions.append(current)
+                current = []
+            current.append(page)
+        if current:
+            sessions.append(current)
+    return sessions
+
+
+def build_workload(n_sessions, profile, rng, usage_sessions=None):
+    """A list of sessions, each a list of (page, [actions]) tuples. Page sequences are replayed from the usage log when
+    one is given, otherwise drawn from the profile. The log does not record dash interactions so those always come from
+    the profile."""
+    pages, page_weights = zip(*profile["pages"].items())
+    actions, action_weights = zip(*profile["actions"].items())
+
+    workload = []
+    for _ in range(n_sessions):
+        if usage_sessions:
+            session_pages = rng.choice(usage_sessions)
+        else:
+            session_pages = rng.choices(pages, page_weights, k=rng.randint(*profile["pages_per_session"]))
+        workload.append([
+            (page, rng.choices(actions, action_weights, k=rng.randint(*profile["actions_per_page"])))
+            for page in session_pages
+        ])
+    return workload
+
+
+# RESULTS
+class Results:
+    """Thread-safe latency samples keyed by request name"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, name, seconds, ok=True):
+        with self.lock:
+            self.samples[name].append(seconds)
+            if not ok:
+                self.errors[name] += 1
+
+    def report(self, elapsed, sessions, failed_sessions=0):
+        def percentile(values, pct):
+            ordered = sorted(values)
+            return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+        total = sum(len(v) for v in self.samples.values())
+        lines = [
+            f"Sessions: {sessions:,}   Failed sessions: {failed_sessions:,}   Requests: {total:,}   "
+            f"Errors: {sum(self.errors.values()):,}   "
+            f"Elapsed: {elapsed:.1f}s   Throughput: {total / elapsed:.1f} req/s",
+            "",
+            f"{'request':<45} {'count':>7} {'errors':>7} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8}",
+        ]
+        for name in sorted(self.samples):
+            values = self.samples[name]
+            lines.append(
+                f"{name:<45} {len(values):>7} {self.errors[name]:>7} "
+                f"{statistics.mean(values) * 1000:>6.1f}ms {percentile(values, 50) * 1000:>6.1f}ms "
+                f"{percentile(values, 95) * 1000:>6.1f}ms {percentile(values, 99) * 1000:>6.1f}ms"
+            )
+        return "\n".join(lines)
+
+
+# SIMULATED USER
+class DashClient:
+    """One simulated browser tab. Holds the props of every component and replays callbacks like the dash renderer"""
+    unsupported_warned = set()
+
+    def __init__(self, base_url, token, results, rng, dash_prefix="/dash/", timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.token = token
+        self.results = results
+        self.rng = rng
+        self.dash_prefix = dash_prefix
+        self.props = {}
+        self.callbacks = []
+        self.search_terms = []
+
+    def request(self, name, path, payload=None, parse=False):
+        url = self.base_url + path
+        data = None
+        headers = {"X-Access-Token": self.token} if self.token else {}
+        if payload is not None:
+            data = json.dumps(payload).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, data=data, headers=headers),
+                                        timeout=self.timeout) as response:
+                body = response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            body, status = e.read(), e.code
+        except (urllib.error.URLError, TimeoutError, socket.timeout, ConnectionError):
+            # an overloaded server that drops or never answers a request counts as an error, not a hang
+            self.results.record(name, time.perf_counter() - start, ok=False)
+            return None
+        self.results.record(name, time.perf_counter() - start, ok=status < 400)
+
+        # 204 is how dash answers a callback that raised PreventUpdate
+        if (parse or payload is not None) and status == 200 and body:
+            return json.loads(body)
+        return None
+
+    # page loads
+    def load_page(self, page):
+        self.request(f"GET {page}", page)
+        self.request("GET /dash/", self.dash_prefix)
+        layout = self.request("GET /dash/_dash-layout", self.dash_prefix + "_dash-layout", parse=True)
+        self.callbacks = self.request("GET /dash/_dash-dependencies", self.dash_prefix + "_dash-dependencies",
+                                      parse=True) or []
+        self.callbacks = self.order_callbacks([cb for cb in self.callbacks if self.is_supported(cb)])
+
+        self.props = {}
+        self.collect_props(layout)
+        changed = set()
+        for component_id in list(self.props):
+            changed |= self.update_derived(component_id)
+
+        initial = [cb for cb in self.callbacks if not cb.get("prevent_initial_call")]
+        self.run_callbacks(initial, changed)
+
+        # search terms are sampled from the identifiers and titles the user can actually see
+        self.search_terms = [
+            word for row in self.get("table", "data") or []
+            for word in (row.get("Identifier"), str(row.get("Title", "")).split(" ")[0]) if word
+        ]
+
+    def collect_props(self, node):
+        if isinstance(node, list):
+            for child in node:
+                self.collect_props(child)
+        elif isinstance(node, dict) and "props" in node:
+            props = node["props"]
+            if isinstance(props.get("id"), str):
+                self.props[props["id"]] = dict(props)
+            self.collect_props(props.get("children"))
+
+    def is_supported(self, cb):
+        """Only single-output callbacks between string ids are emulated; warn once about anything else"""
+        supported = not cb["output"].startswith("..") and all(
+            isinstance(dep["id"], str) and not dep["id"].startswith("{") for dep in cb["inputs"] + cb["state"])
+        if not supported and cb["output"] not in self.unsupported_warned:
+            self.unsupported_warned.add(cb["output"])
+            print(f"Skipping callback {cb['output']}: multi-output and pattern-matching callbacks are not emulated",
+                  file=sys.stderr)
+        return supported
+
+    @staticmethod
+    def order_callbacks(callbacks):
+        """Topologically sort callbacks so any callback runs after the callbacks that produce its inputs"""
+        producers = {cb["output"]: cb for cb in callbacks}
+        ordered, visiting, done = [], set(), set()
+
+        def visit(cb):
+            if cb["output"] in done or cb["output"] in visiting:
+                return
+            visiting.add(cb["output"])
+            for dependency in cb["inputs"]:
+                upstream = producers.get(f"{dependency['id']}.{dependency['property']}")
+                if upstream is not None:
+                    visit(upstream)
+            visiting.discard(cb["output"])
+            done.add(cb["output"])
+            ordered.append(cb)
+
+        for cb in callbacks:
+            visit(cb)
+        return ordered
+
+    # props
+    def get(self, component_id, prop):
+        return self.props.get(component_id, {}).get(prop)
+
+    def set(self, component_id, prop, value):
+        self.props.setdefault(component_id, {})[prop] = value
+        return {f"{component_id}.{prop}"} | self.update_derived(component_id)
+
+    def update_derived(self, component_id):
+        """Recompute the derived_* props a DataTable computes in the browser after its data, filter or selection change"""
+        props = self.props.get(component_id)
+        if props is None or "data" not in props or "row_selectable" not in props:
+            return set()
+
+        rows = props.get("data") or []
+        terms = re.findall(r'icontains "(.*?)"', props.get("filter_query") or "")
+        if terms:
+            terms = [t.lower() for t in terms]
+            rows = [row for row in rows if any(t in str(v).lower() for t in terms for v in row.values())]
+        props["derived_virtual_data"] = rows
+        props["derived_virtual_selected_rows"] = [i for i in props.get("selected_rows") or [] if i < len(rows)]
+        return {f"{component_id}.derived_virtual_data", f"{component_id}.derived_virtual_selected_rows"}
+
+    # callbacks
+    def run_callbacks(self, callbacks, changed):
+        """Fire each callback, in dependency order, if it is in the initial set or one of its inputs changed"""
+        initial = {cb["output"] for cb in callbacks}
+        for cb in self.callbacks:
+            triggered = [f"{i['id']}.{i['property']}" for i in cb["inputs"]
+                         if f"{i['id']}.{i['property']}" in changed]
+            if cb["output"] not in initial and not triggered:
+                continue
+            changed |= self.fire(cb, triggered)
+
+    def fire(self, cb, triggered):
+        output_id, output_prop = cb["output"].rsplit(".", 1)
+        payload = {
+            "output": cb["output"],
+            "outputs": {"id": output_id, "property": output_prop},
+            "inputs": [dict(i, value=self.get(i["id"], i["property"])) for i in cb["inputs"]],
+            "state": [dict(s, value=self.get(s["id"], s["property"])) for s in cb["state"]],
+            "changedPropIds": triggered,
+        }
+        response = self.request(f"callback {cb['output']}", self.dash_prefix + "_dash-update-component", payload)
+        if not response:
+            return set()
+
+        changed = set()
+        for component_id, props in response.get("response", {}).items():
+            for prop, value in props.items():
+                changed |= self.set(component_id, prop, value)
+        return changed
+
+    def trigger(self, component_id, prop, value):
+        self.run_callbacks([], self.set(component_id, prop, value))
+
+    # interactions
+    def pick_rows(self, n_rows, max_selected=3):
+        """Both tables are multi-select, so users pick one or a few rows"""
+        return self.rng.sample(range(n_rows), self.rng.randint(1, min(max_selected, n_rows)))
+
+    def search(self):
+        if not self.search_terms:
+            return
+        self.trigger("global-search", "value", self.rng.choice(self.search_terms))
+        self.trigger("global-search", "n_submit", (self.get("global-search", "n_submit") or 0) + 1)
+
+    def select_table(self):
+        rows = self.get("table", "data") or []
+        if rows:
+            self.trigger("table", "selected_rows", self.pick_rows(len(rows)))
+
+    def select_table_two(self):
+        rows = self.get("table_two", "derived_virtual_data") or []
+        if rows:
+            self.trigger("table_two", "selected_rows", self.pick_rows(len(rows)))
+
+    def layer_toggle(self):
+        value = self.get("layer-toggle", "value") or []
+        flipped = [v for v in value if v != "show"] if "show" in value else value + ["show"]
+        self.trigger("layer-toggle", "value", flipped)
+
+    def sunburst_click(self):
+        figure = self.get("sunburst-chart", "figure") or {}
+        segments = figure.get("data", [{}])[0].get("ids") if figure.get("data") else None
+        if segments:
+            self.trigger("sunburst-chart", "clickData", {"points": [{"id": self.rng.choice(segments)}]})
+
+    def run_session(self, session, think_time):
+        for page, actions in session:
+            self.load_page(page)
+            for action in actions:
+                if think_time:
+                    time.sleep(self.rng.uniform(0, think_time))
+                getattr(self, action)()
+
+
+# RUNNER
+def spawn_gunicorn(port, workers, threads):
+    process = subprocess.Popen([
+        sys.executable, "-m", "gunicorn", "main:app", "--bind", f"127.0.0.1:{port}",
+        "--workers", str(workers), "--threads", str(threads),
+    ])
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("gunicorn exited before it started serving")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/dash/_dash-dependencies", timeout=1)
+            return process
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("gunicorn did not start within 120 seconds")
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    usage_sessions = None if args.synthetic else load_usage_sessions(args.log)
+    workload = build_workload(args.sessions, SYNTHETIC_PROFILE, rng, usage_sessions)
+
+    results = Results()
+    deadline = time.time() + args.duration if args.duration else None
+    queue_lock = threading.Lock()
+    completed = [0]
+    failed = [0]
+
+    def worker(seed):
+        client = DashClient(args.url, args.token, results, random.Random(seed), timeout=args.timeout)
+        while deadline is None or time.time() < deadline:
+            with queue_lock:
+                if not workload:
+                    return
+                session = workload.pop()
+            try:
+                client.run_session(session, args.think_time)
+            except Exception:
+                # a bug in the simulated client must not quietly shrink the sample, so count it and carry on
+                traceback.print_exc()
+                with queue_lock:
+                    failed[0] += 1
+                continue
+            with queue_lock:
+                completed[0] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        futures = [pool.submit(worker, rng.random() + i) for i in range(args.clients)]
+    for future in futures:
+        future.result()
+    print(results.report(time.perf_counter() - start, completed[0], failed[0]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a realistic session mix against the OPSS app")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="base url of a running instance")
+    parser.add_argument("--token", default="", help="access token for the website routes")
+    parser.add_argument("--log", default="./logs/OPSS_usage.log", help="usage log to build page sessions from")
+    parser.add_argument("--synthetic", action="store_true", help="ignore the usage log and use SYNTHETIC_PROFILE")
+    parser.add_argument("--clients", type=int, default=10, help="number of concurrent simulated users")
+    parser.add_argument("--sessions", type=int, default=100, help="number of sessions to run")
+    parser.add_argument("--duration", type=float, default=0, help="stop after this many seconds (0 runs all sessions)")
+    parser.add_argument("--think-time", type=float, default=0, help="max random pause in seconds between interactions")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds before a request is counted as an error")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--spawn", action="store_true", help="start a local gunicorn instance for the run")
+    parser.add_argument("--port", type=int, default=8000, help="port for the spawned gunicorn instance")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes when spawning")
+    parser.add_argument("--threads", type=int, default=1, help="gunicorn threads per worker when spawning")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        args.url = f"http://127.0.0.1:{args.port}"
+        server = spawn_gunicorn(args.port, args.workers, args.threads)
+    try:
+        run(args)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
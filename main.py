@@ -1,6 +1,8 @@
-from flask import Flask, render_template, request, abort
+from flask import Flask, render_template, request, abort, jsonify
 import pandas as pd
 from visualisations import dashboard
+from diagnostics import memory_report
+from search_index import PrefixIndex
 import logging
 import datetime
 
@@ -90,6 +92,19 @@ def topics():
 def about():
     return render_template('new_layout.html', dash_url='/dash/')
 
+# DIAGNOSTICS ROUTES
+"""Protected by the same access token as the website routes. Each gunicorn worker holds its own copy of the data so the
+report describes whichever worker served the request (see pid in the response). Pass ?tracemalloc=start to begin tracing
+on that worker, ?tracemalloc=N on later requests for the top N allocation sites and ?tracemalloc=stop when done."""
+@app.route('/diagnostics/memory')
+def diagnostics_memory():
+    tracemalloc_action = request.args.get('tracemalloc')
+    if tracemalloc_action is not None and tracemalloc_action not in ('start', 'stop'):
+        if not tracemalloc_action.isdigit() or int(tracemalloc_action) <= 0:
+            abort(400)  # Bad request
+        tracemalloc_action = int(tracemalloc_action)
+    return jsonify(memory_report(dash_app, tracemalloc_action=tracemalloc_action))
+
 # LOAD DATA FROM CSV
 def load_data():
     try:
@@ -117,19 +132,25 @@ def load_data():
 
         df["Identifier"] = df["Identifier"].str.replace("(inaccessible)", "")
 
-        return [df, references]
+        # typeahead suggestions for the global search box
+        # references went through astype(str) above, so its missing standards are the string 'nan' rather than NaN
+        standards = references["standard"].str.replace('\u200B', '')
+        search_index = PrefixIndex(pd.concat([df["Identifier"], df["Title"], standards[standards != 'nan']]).dropna())
+
+        return [df, references, search_index]
 
     except Exception as e:
         print("Error loading data: ", e)
-        return [pd.DataFrame(), pd.DataFrame()]
+        return [pd.DataFrame(), pd.DataFrame(), PrefixIndex([])]
 
 # Load data on import (Render needs this to happen always)
 data = load_data()
 df = data[0]
 references = data[1]
+search_index = data[2]
 
 # Mount Dash app
-dash_app = dashboard(app, df, references, routes="/dash/")
+dash_app = dashboard(app, df, references, routes="/dash/", search_index=search_index)
 
 # Only run Flask server when testing locally
 if __name__ == "__main__":
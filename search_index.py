@@ -0,0 +1,46 @@
+from bisect import bisect_left
+from functools import lru_cache
+
+'''
+This file declares the prefix index that powers the typeahead suggestions under the global search box. It is built once
+in load_data (main.py) from the Identifier and Title columns of the lookup table and the cleaned standards that power the
+sunburst, and answers prefix queries with a binary search over a sorted array of lower-cased keys.
+'''
+
+
+class PrefixIndex:
+    def __init__(self, values, cache_size=4096):
+        # one entry per distinct lower-cased key, keeping the first spelling seen for display
+        entries = {}
+        for value in values:
+            value = str(value).strip()
+            if value and value.lower() not in entries:
+                entries[value.lower()] = value
+
+        self.keys = sorted(entries)
+        self.values = [entries[key] for key in self.keys]
+
+        # per-prefix result cache, keyed on the normalised prefix so "ISO", "iso " and "Iso" share one entry
+        self._cached_suggest = lru_cache(maxsize=cache_size)(self._suggest)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def cache_info(self):
+        """Hit/miss counts of the per-prefix cache, reported by the diagnostics route"""
+        return self._cached_suggest.cache_info()
+
+    def suggest(self, prefix, k=10):
+        """Up to k values starting with prefix (case-insensitive) in sorted order, so an exact match comes first"""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return ()
+        return self._cached_suggest(prefix, k)
+
+    def _suggest(self, prefix, k):
+        """Uncached lookup for an already normalised prefix"""
+        # matching keys are contiguous in the sorted array, starting at the insertion point of the prefix
+        start = bisect_left(self.keys, prefix)
+        return tuple(
+            self.values[i] for i in range(start, min(start + k, len(self.keys))) if self.keys[i].startswith(prefix)
+        )
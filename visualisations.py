@@ -1,10 +1,12 @@
 import dash
+import numpy as np
 import pandas as pd
 from dash import dash_table, dcc, html
 import dash_bootstrap_components as dbc
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
 import plotly.graph_objects as go
 import plotly.express as px
+from search_index import PrefixIndex
 
 '''
 AUTHOR: Josh Swan
@@ -15,21 +17,180 @@ that runs the data table and visualisation is declared here and runs within the
 '''
 
 class dashboard:
-    def __init__(self, server, df, references, routes):
+    def __init__(self, server, df, references, routes, search_index=None):
         self.dash_app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP],
                                   suppress_callback_exceptions=True, routes_pathname_prefix=routes, server=server)
         self.df = df
         self.references = references
-        self.setup_layout()
-        self.setup_callbacks()
-        self.visualisation_callbacks()
+        self.search_index = search_index if search_index is not None else PrefixIndex([])
+        self.caches = {"typeahead": self.search_index}  # name -> cache object, reported by the /diagnostics/memory route
         self.routes = routes
 
         self.ZERO = '\u200B'  # or '\u2060', whichever you’ve settled on
+        self.ID_SEP = ' » '  # joins labels into the unique sunburst segment ids
+        self.MORE = '+more'  # last part of the id of a collapsed "+N more" segment
+        self.MAX_DEPTH = 3  # designated -> references -> lowest layer
+        self.MAX_RING_NODES = 60  # level-of-detail cap on segments added per ring or per click
 
-    def clean_label(self, s: str) -> str:
-        # remove zero-width marks *and* your "(inaccessible)" tag
-        return s.replace(self.ZERO, '').replace('(inaccessible)', '')
+        self.build_reference_index()
+        self.setup_layout()
+        self.setup_callbacks()
+        self.visualisation_callbacks()
+
+    def build_reference_index(self):
+        """Clean the standard/parent columns once and index row positions by them, so the callbacks can resolve any
+        number of selected identifiers with dictionary lookups instead of re-scanning self.references per selection"""
+        if self.references.empty:
+            self.references = pd.DataFrame(columns=["standard", "parent", "type"])
+
+        def clean_column(column):
+            # remove zero-width marks *and* the "(inaccessible)" tag
+            return self.references[column].str.replace(self.ZERO, '').str.replace('(inaccessible)', '').to_numpy()
+
+        self.clean_standard = clean_column("standard")
+        self.clean_parent = clean_column("parent")
+        self.is_designated = (self.references["parent"] == "Standard").to_numpy()
+
+        self.rows_by_standard = pd.Series(self.clean_standard).groupby(self.clean_standard).indices
+        self.rows_by_parent = pd.Series(self.clean_parent).groupby(self.clean_parent).indices
+        self.fan_out = {standard: len(rows) for standard, rows in self.rows_by_parent.items()}
+
+    def reference_indexes(self):
+        """The structures built by build_reference_index, which live for the whole process and are reported by the
+        /diagnostics/memory route"""
+        return {name: getattr(self, name) for name in
+                ("clean_standard", "clean_parent", "is_designated", "rows_by_standard", "rows_by_parent", "fan_out")}
+
+    @staticmethod
+    def lookup_rows(index, keys):
+        """Row positions for every key in keys, in one pass over the (deduplicated) keys"""
+        found = [index[k] for k in set(keys) if k in index]
+        return np.unique(np.concatenate(found)) if found else np.array([], dtype=int)
+
+    def resolve_designated(self, identifiers):
+        """Designated standards that are, reference, or are two layers above any of identifiers"""
+        rows = np.union1d(self.lookup_rows(self.rows_by_standard, identifiers),
+                          self.lookup_rows(self.rows_by_parent, identifiers))
+        designated = set()
+        # the selected standards themselves plus up to two layers of parents, matching the depth of the sunburst
+        for _ in range(3):
+            designated.update(self.clean_standard[rows[self.is_designated[rows]]])
+            not_designated = self.clean_parent[rows[~self.is_designated[rows]]]
+            if len(not_designated) == 0:
+                break
+            rows = self.lookup_rows(self.rows_by_standard, not_designated)
+        return designated
+
+    def child_ring(self, ring):
+        """Every child segment of the segments in ring (id and standard columns), found with a single lookup over the
+        unique labels in ring. A standard referenced from several places has its children found once and shared by
+        every copy. Segment ids are the path of labels from the root, which keeps repeated standards in separate
+        segments without zero-width marks."""
+        rows = self.lookup_rows(self.rows_by_parent, ring["standard"])
+        children = self.references.iloc[rows].copy()
+        children["standard"] = self.clean_standard[rows]
+        children["parent"] = self.clean_parent[rows]
+        children = children.drop_duplicates(subset=["parent", "standard"])
+
+        children = ring[["id", "standard"]].drop_duplicates(subset="id").merge(
+            children, left_on="standard", right_on="parent", suffixes=("_ring", ""))
+        children["parent_id"] = children["id"]
+        children["id"] = children["parent_id"] + self.ID_SEP + children["standard"]
+        return children[list(self.references.columns) + ["id", "parent_id"]]
+
+    def collapse_ring(self, ring, max_nodes):
+        """Cap ring at max_nodes segments, counting the "+N more" segments against the cap. The budget is water-filled:
+        parents with no more children than the fair share show all of them, and what is left is split evenly between
+        the larger parents, with any remainder going to the largest. A parent that cannot show all of its children
+        keeps those with the largest fan-out and collapses the rest (always two or more) into one "+N more" segment.
+        The cap is only exceeded when ring has more parents than max_nodes"""
+        if max_nodes is None or len(ring) <= max_nodes:
+            return ring
+
+        children = ring.groupby("parent_id").size().sort_values(kind="stable")
+        budget, left = max_nodes, len(children)
+        for count in children:
+            if count > max(1, budget // left):
+                break
+            budget -= count
+            left -= 1
+        if left == 0:
+            # only possible when there are more parents than max_nodes, each with a single child
+            return ring
+
+        segments = children.copy()
+        larger = children.index[len(children) - left:]
+        share = max(1, budget // left)
+        segments[larger] = share
+        segments[larger[::-1][:max(0, budget - share * left)]] += 1
+
+        # a parent with fewer segments than children gives its last segment to "+N more"
+        shown = segments.where(segments == children, segments - 1)
+        hidden = (children - shown)[children > shown]
+
+        ring = ring.assign(fan_out=ring["standard"].map(self.fan_out).fillna(0)).sort_values(
+            ["parent_id", "fan_out", "standard"], ascending=[True, False, True])
+        rank = ring.groupby("parent_id").cumcount()
+
+        more = pd.DataFrame({"parent_id": hidden.index, "count": hidden.to_numpy()}).reindex(
+            columns=list(ring.columns) + ["count"], fill_value='')
+        more["id"] = more["parent_id"] + self.ID_SEP + self.MORE
+        more["standard"] = "+" + more["count"].astype(str) + " more"
+        more["Short_Title"] = "Click to show " + more["count"].astype(str) + " more"
+        more["type"] = "More"
+
+        kept = ring[rank < ring["parent_id"].map(shown)]
+        return pd.concat([kept, more], ignore_index=True)[list(self.references.columns) + ["id", "parent_id"]]
+
+    def build_sunburst_frame(self, roots, depth, max_ring_nodes=None):
+        """One row per sunburst segment for all of roots, down to depth rings, with each ring below the roots capped at
+        max_ring_nodes segments (no cap when None)"""
+        root_rows = []
+        for root in dict.fromkeys(roots):
+            rows = self.rows_by_standard.get(root)
+            if rows is None:
+                continue
+            designated_rows = rows[self.is_designated[rows]]
+            root_rows.append(designated_rows[0] if len(designated_rows) else rows[0])
+
+        ring = self.references.iloc[root_rows].copy()
+        ring["standard"] = self.clean_standard[root_rows]
+        ring["id"] = ring["standard"]
+        ring["parent_id"] = ''
+        rings = [ring]
+
+        for _ in range(depth - 1):
+            ring = self.collapse_ring(self.child_ring(ring), max_ring_nodes)
+            if ring.empty:
+                break
+            rings.append(ring)
+
+        return pd.concat(rings, ignore_index=True)
+
+    def expand_segment(self, figure, segment_id, max_nodes, max_depth):
+        """Segments to add to figure when segment_id is clicked in level-of-detail mode. A "+N more" segment is replaced
+        by the next max_nodes of its hidden siblings; any other segment gets its children loaded, unless they are
+        already shown or it sits on ring max_depth. Returns None when there is nothing to load."""
+        trace = figure["data"][0]
+        labels = dict(zip(trace["ids"], trace["labels"]))
+        parents = dict(zip(trace["ids"], trace["parents"]))
+        # a stale click, or plotly's implicit centre when there are several roots, is not a segment of this figure
+        if segment_id not in labels:
+            return None
+
+        if segment_id.endswith(self.ID_SEP + self.MORE):
+            parent_id = parents[segment_id]
+        else:
+            parent_id = segment_id
+            if segment_id.count(self.ID_SEP) + 1 >= max_depth or segment_id in parents.values():
+                return None
+
+        shown = {labels[i] for i, p in parents.items() if p == parent_id}
+        children = self.child_ring(pd.DataFrame({"id": [parent_id], "standard": [labels[parent_id]]}))
+        children = children[~children["standard"].isin(shown)]
+        if children.empty:
+            return None
+        return self.collapse_ring(children, max_nodes)
 
     def setup_layout(self):
         self.dash_app.layout = dbc.Container(fluid=True, children=[
@@ -40,7 +201,8 @@ class dashboard:
                     dbc.Col(
                         html.Div([
                             html.H3("Lookup Table", style={'fontFamily': 'Noto Serif'}),
-                            dcc.Input(id='global-search', type='text', placeholder='Global search...', style={"margin-bottom": "20px", "width": "75%"}),
+                            dcc.Input(id='global-search', type='text', placeholder='Global search...', list='global-search-suggestions', style={"margin-bottom": "20px", "width": "75%"}),
+                            html.Datalist(id='global-search-suggestions', children=[]),  # typeahead dropdown for the search box
                             dbc.Button("Search", id="search-button", className="btn", style={"background-color":"#24262e"}),
                             dbc.Button("Clear", id="clear-button", outline=True, color="secondary"),
 
@@ -54,7 +216,7 @@ class dashboard:
                                 sort_action='native',
                                 sort_mode='multi',
                                 column_selectable='single',
-                                row_selectable="single", # was multi
+                                row_selectable="multi",
                                 row_deletable=False,
                                 selected_columns=[],
                                 selected_rows=[0],
@@ -159,7 +321,7 @@ class dashboard:
                                 sort_action='native',
                                 sort_mode='multi',
                                 column_selectable='single',
-                                row_selectable="single", # was multi
+                                row_selectable="multi",
                                 row_deletable=False,
                                 selected_columns=[],
                                 selected_rows=[0],
@@ -238,8 +400,9 @@ class dashboard:
                             html.H3("Sunburst", style={'fontFamily': 'Noto Serif', 'margin-bottom': '5px', 'margin-top': '50px'}),
                             dcc.Checklist(
                                 id='layer-toggle',
-                                options=[{'label': ' Show Lowest Layer', 'value': 'show'}],
-                                value=['show'],
+                                options=[{'label': ' Show Lowest Layer', 'value': 'show'},
+                                         {'label': ' Level of Detail (click a segment to load more)', 'value': 'lod'}],
+                                value=['show', 'lod'],
                                 style={'margin': '10px 0', 'fontFamily': 'Noto Sans', 'fontSize': '12pt'}
                             ),
                             dcc.Graph(id='sunburst-chart', style={"height": "1000px"}, className='graph-shadow')
@@ -306,40 +469,9 @@ class dashboard:
             if not selected_rows:
                 return []
 
-            output = []
-            # Collect data for selected rows
+            # Collect data for selected rows and resolve all of them in one batched pass
             combined_data = self.df.iloc[selected_rows]["Identifier"].to_list()
-            # print("combined_data", combined_data)
-
-            #filtered_df = self.references[self.references["standard"].apply(self.clean_label).isin(combined_data)]
-            filtered_df = self.references[(self.references["standard"].str.replace('\u200B', '').isin(combined_data)) | (self.references["parent"].str.replace('\u200B', '').isin(combined_data))].drop_duplicates(subset="standard")
-            # filtered_df = self.references[self.references["parent"].str.replace('\u200B', '').isin(combined_data)]
-
-            # print("filtered_df", filtered_df.to_string())
-
-            output += filtered_df["standard"][filtered_df["parent"] == "Standard"].to_list()
-            # print(f"output1: {output}")
-
-            not_designated = filtered_df["parent"][filtered_df["parent"] != "Standard"].to_list()
-            # print(f"not_designated1: {not_designated}")
-
-            if len(not_designated) > 0:
-                # dealing with layer 2s to find designated
-                filtered_df = self.references[self.references["standard"].apply(self.clean_label).isin(not_designated)]
-
-                output += filtered_df["standard"][filtered_df["parent"] == "Standard"].to_list()
-                # print(f"output2: {output}")
-
-                not_designated = filtered_df["parent"][filtered_df["parent"] != "Standard"].to_list()
-                # print(f"not_designated2: {not_designated}")
-
-                if len(not_designated) > 0:
-                    # dealing with layer 2s to find designated
-                    filtered_df = self.references[self.references["standard"].apply(self.clean_label).isin(not_designated)]
-
-                    output += filtered_df["standard"][filtered_df["parent"] == "Standard"].to_list()
-                    # print(f"output3: {output}")
-                    # print("Output", output)
+            output = self.resolve_designated(combined_data)
 
             combined_data = self.df[["Identifier", "Title"]][self.df["Identifier"].isin(output)]
             # print(combined_data.to_string(index=False))
@@ -408,6 +540,19 @@ class dashboard:
                     return ' || '.join(filter_queries)
             return ''
 
+        @self.dash_app.callback(
+            Output('global-search-suggestions', 'children'),
+            Input('global-search', 'value')
+        )
+        def update_suggestions(search_value):
+            if not search_value:
+                return []
+            # suggest for the term being typed, keeping everything before it exactly as typed so the browser, which
+            # only shows options containing the typed text, does not hide them
+            typing = search_value.rpartition(",")[2]
+            typed = search_value[:len(search_value) - len(typing.lstrip())]
+            return [html.Option(value=typed + suggestion) for suggestion in self.search_index.suggest(typing)]
+
         @self.dash_app.callback(
             Output('global-search', 'value'),
             Input('clear-button', 'n_clicks')
@@ -425,6 +570,91 @@ class dashboard:
             else:
                 return []
 
+    def sunburst_figure(self, filtered, identifiers):
+        """Sunburst figure for the segments in filtered (from build_sunburst_frame) with identifiers highlighted"""
+        #adding in type change to make segment green
+        # Mark the selected nodes by appending (selected) to their type
+        selected = filtered["standard"].isin(identifiers)
+        filtered.loc[selected, "type"] = filtered.loc[selected, "type"] + "(selected)"
+
+        # Create a separate column for color mapping
+        filtered["color_type"] = filtered["type"]
+
+        # For the selected nodes, override the color_type to be "selected"
+        filtered.loc[selected, "color_type"] = "selected"
+
+        # Create the sunburst chart using the new 'color_type' column for coloring
+        fig = px.sunburst(
+            filtered,
+            ids='id',
+            names='standard',
+            parents='parent_id',
+            color="color_type",  # use color_type for coloring
+            color_discrete_map={
+                'Designated': '#F6BA00',
+                'Normative': '#030072',
+                'Informative': '#950200',
+                'Normative-No Full Text': '#030072',
+                'Informative-No Full Text': '#950200',
+                'More': '#A9A9A9',  # collapsed "+N more" segments in level-of-detail mode
+                'selected': "green"  # maps our selected node to green
+            },
+            hover_data=["standard", "Short_Title", "CommitteeReference", "Classification", "IssuingBody",
+                        "PublicationDate", "type", "ACCode"],
+        )
+
+        # Define and update hover template as before
+        hover_template = (
+            '<br><b>ACCode:</b> %{customdata[6]}'
+            '<br><b>Identifier:</b> %{customdata[0]}'
+            '<br><b>Title:</b> %{customdata[1]}'
+            '<br><b>Committee:</b> %{customdata[2]}'
+            '<br><b>ICS:</b> %{customdata[3]}'
+            '<br><b>Published:</b> %{customdata[4]}'
+            '<br><b>Reference:</b> %{customdata[5]}<extra></extra>'
+        )
+
+        fig.update_traces(
+            customdata=filtered[
+                ['standard', 'Short_Title', 'CommitteeReference', 'Classification', 'PublicationDate',
+                 'type', "ACCode"]].values,
+            hovertemplate=hover_template,
+            insidetextorientation='radial',
+            hoverinfo='label+value+text',
+        )
+
+        fig.update_layout(
+            margin=dict(t=100, l=0, r=0, b=100)
+        )
+
+        return fig
+
+    def merge_segments(self, figure, segment_id, added, identifiers):
+        """Append the segments in added to the sunburst figure already on screen, replacing segment_id if it was a
+        "+N more" segment, and keep the view zoomed where the user clicked"""
+        trace = figure["data"][0]
+        new_trace = self.sunburst_figure(added, identifiers).data[0]
+        arrays = {
+            "ids": list(new_trace.ids),
+            "labels": list(new_trace.labels),
+            "parents": list(new_trace.parents),
+            "customdata": new_trace.customdata.tolist(),
+        }
+
+        if segment_id.endswith(self.ID_SEP + self.MORE):
+            trace["level"] = trace["parents"][trace["ids"].index(segment_id)]
+            keep = [i for i, segment in enumerate(trace["ids"]) if segment != segment_id]
+            for key in arrays:
+                trace[key] = [trace[key][i] for i in keep]
+            trace["marker"]["colors"] = [trace["marker"]["colors"][i] for i in keep]
+        else:
+            trace["level"] = segment_id
+
+        for key, values in arrays.items():
+            trace[key] = list(trace[key]) + values
+        trace["marker"]["colors"] = list(trace["marker"]["colors"]) + list(new_trace.marker.colors)
+        return figure
+
     def visualisation_callbacks(self):
         @self.dash_app.callback(
             Output('sunburst-chart', 'figure'),
@@ -433,12 +663,28 @@ class dashboard:
                 Input('table', 'data'),  # Get data from the main table
                 Input('table_two', 'derived_virtual_selected_rows'),
                 Input('table_two', 'derived_virtual_data'),
-                Input('layer-toggle', 'value')
-            ]
+                Input('layer-toggle', 'value'),
+                Input('sunburst-chart', 'clickData')
+            ],
+            State('sunburst-chart', 'figure')
         )
-        def update_graph(selected_rows, table_data, table_two_selected_rows, derived_virtual_data, toggle_button):
-            # Get the selected identifier from table based on selected_rows
-            identifier = table_data[selected_rows[0]]['Identifier'] if selected_rows else None
+        def update_graph(selected_rows, table_data, table_two_selected_rows, derived_virtual_data, toggle_button,
+                         click_data, figure):
+            # Get the selected identifiers from table based on selected_rows
+            identifiers = [table_data[i]['Identifier'] for i in selected_rows] if selected_rows else []
+            level_of_detail = 'lod' in toggle_button
+            depth = self.MAX_DEPTH if 'show' in toggle_button else 2
+
+            # In level of detail mode clicking a segment loads its children into the figure already on screen
+            ctx = dash.callback_context
+            if ctx.triggered and ctx.triggered[0]['prop_id'] == 'sunburst-chart.clickData':
+                if not level_of_detail or not click_data or not figure or not figure['data'] or 'ids' not in figure['data'][0]:
+                    return dash.no_update
+                segment_id = click_data['points'][0].get('id')
+                added = self.expand_segment(figure, segment_id, self.MAX_RING_NODES, depth) if segment_id else None
+                if added is None:
+                    return dash.no_update
+                return self.merge_segments(figure, segment_id, added, identifiers)
 
             if table_two_selected_rows is None or len(table_two_selected_rows) == 0:
                 fig = go.Figure()
@@ -456,164 +702,13 @@ class dashboard:
                 )
                 return fig
 
-            # 1) grab the clean identifiers the user selected in table two
+            # grab the clean identifiers the user selected in table two, each becomes a root of the sunburst
             clean_selected = [derived_virtual_data[i]['Identifier'] for i in table_two_selected_rows]
 
-            # 2) find *all* variants of those selected (i.e. with any number of zero‐width spaces)
-            designated = self.references[
-                self.references['standard'].apply(self.clean_label).isin(clean_selected)
-            ]['standard'].tolist()
-
-            # 3) find *all* standards whose parent (cleaned) matches one of the clean_selected
-            parents = self.references[
-                self.references['parent'].apply(self.clean_label).isin(clean_selected)
-            ]['standard'].tolist()
-
-            # 4) optionally go down one more layer
-            if 'show' in toggle_button:
-                clean_parents = [self.clean_label(p) for p in parents]
-                children = self.references[
-                    self.references['parent'].apply(self.clean_label).isin(clean_parents)
-                ]['standard'].tolist()
-            else:
-                children = []
-
-            # 5) collect everything
-            all_standards = sorted(designated + parents + children)
-
-
-            all_standards = sorted(designated + parents + children)
-
-
-            filtered = self.references[self.references["standard"].isin(all_standards)]
-            filtered[['standard', 'parent']] = filtered[['standard', 'parent']].applymap(lambda x: self.clean_label(x))
-            filtered = filtered.drop_duplicates()
-
-            # filtered.to_excel("fiter_1.xlsx", index=False)
-
-            zero_width_space = '\u2060'
-            def add_zero_width_space(text, index):
-                # zero_width_space = '<mark>'
-                # zero_width_space = '\u200B'
-                # zero_width_space = '\u2060'
-                return text + zero_width_space * index
-
-
-            filtered['standard'] = filtered.groupby('standard').cumcount().apply(lambda x: add_zero_width_space('', x)) + filtered[
-                'standard']
-            filtered = filtered.sort_values(by=["type", "standard"])
-
-            marked = filtered["standard"][filtered["standard"].str.contains(zero_width_space)].to_list()
-
-            for m in marked:
-                cleaned = str(m).replace(zero_width_space, "")
-
-                associated = filtered[filtered["parent"] == cleaned]
-
-                associated["parent"] = m
-
-                filtered = pd.concat([filtered, associated]).reset_index(drop=True)
-
-
-
-            filtered.drop_duplicates(subset=["standard", "parent"], inplace=True)
-            # filtered.to_excel("filtered_1.xlsx", index=False)
-
-            def ensure_unique(series: pd.Series) -> pd.Series:
-                """
-                Return a copy of `series` (cast to string) where any duplicate values
-                have '<mark>' prepended repeatedly until all entries are unique.
-                """
-                s = series.astype(str).copy()  # work on strings
-                # As long as there are duplicates, mark them
-                while not s.is_unique:
-                    dup_mask = s.duplicated(keep='first')
-                    # prepend '<mark>' to every duplicate beyond its first occurrence
-                    s.loc[dup_mask] = zero_width_space + s.loc[dup_mask]
-                return s
-
-            filtered["standard"] = ensure_unique(filtered["standard"])
-
-            # Function to limit levels
-            def limit_levels(df):
-                """This function prevents a 4th layer to appear which sometimes happens"""
-                designated = df["standard"][df["parent"] == "Standard"].to_list()
-                layer2_identifiers = df["standard"][df["parent"].isin(designated)].to_list()
-
-                df = df[(df["parent"].isin([self.clean_label(std) for std in layer2_identifiers])) |
-                        (df["parent"].isin([self.clean_label(std) for std in designated])) |
-                        (df["parent"] == "Standard") | (df["parent"] == "root")]
-
-                for standard in layer2_identifiers:
-                    update_list = df[df["parent"] == self.clean_label(standard)]
-
-                    for index, row in update_list.iterrows():
-                        df.at[index, "parent"] = standard
-
-                df["standard"] = df["standard"].apply(lambda x: self.clean_label(x) if x not in designated and x not in layer2_identifiers else x)
-
-                return df
-
-
-            filtered = limit_levels(filtered).reset_index(drop=True)
-
-            #adding in type change to make segment green
-            # Mark the selected node by appending (selected) to its type
-            filtered.loc[filtered["standard"] == identifier, "type"] = (
-                    filtered.loc[filtered["standard"] == identifier, "type"] + "(selected)"
-            )
-
-            # Create a separate column for color mapping
-            filtered["color_type"] = filtered["type"]
-
-            # For the selected node, override the color_type to be "selected"
-            filtered.loc[filtered["standard"] == identifier, "color_type"] = "selected"
-
-            # Remove the dummy root node by setting top-level parent to an empty string
-            filtered.loc[filtered['parent'].isin(['Standard', 'root']), 'parent'] = ''
+            # designated -> references -> (optionally) the lowest layer, capped per ring in level of detail mode
+            filtered = self.build_sunburst_frame(clean_selected, depth=depth,
+                                                 max_ring_nodes=self.MAX_RING_NODES if level_of_detail else None)
 
-            # Create the sunburst chart using the new 'color_type' column for coloring
-            fig = px.sunburst(
-                filtered,
-                names='standard',
-                parents='parent',
-                color="color_type",  # use color_type for coloring
-                color_discrete_map={
-                    'Designated': '#F6BA00',
-                    'Normative': '#030072',
-                    'Informative': '#950200',
-                    'Normative-No Full Text': '#030072',
-                    'Informative-No Full Text': '#950200',
-                    'selected': "green"  # maps our selected node to green
-                },
-                hover_data=["standard", "Short_Title", "CommitteeReference", "Classification", "IssuingBody",
-                            "PublicationDate", "type", "ACCode"],
-            )
-
-            # Define and update hover template as before
-            hover_template = (
-                '<br><b>ACCode:</b> %{customdata[6]}'
-                '<br><b>Identifier:</b> %{customdata[0]}'
-                '<br><b>Title:</b> %{customdata[1]}'
-                '<br><b>Committee:</b> %{customdata[2]}'
-                '<br><b>ICS:</b> %{customdata[3]}'
-                '<br><b>Published:</b> %{customdata[4]}'
-                '<br><b>Reference:</b> %{customdata[5]}<extra></extra>'
-            )
-
-            fig.update_traces(
-                customdata=filtered[
-                    ['standard', 'Short_Title', 'CommitteeReference', 'Classification', 'PublicationDate',
-                     'type', "ACCode"]].values,
-                hovertemplate=hover_template,
-                insidetextorientation='radial',
-                hoverinfo='label+value+text',
-            )
-
-            fig.update_layout(
-                margin=dict(t=100, l=0, r=0, b=100)
-            )
-
-            return fig
+            return self.sunburst_figure(filtered, identifiers)
 
 